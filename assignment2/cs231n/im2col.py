@@ -1,13 +1,19 @@
 import numpy as np
 
+# (k, i, j) index arrays keyed on everything but the batch size
+_im2col_indices_cache = {}
+
 
 def get_im2col_indices(x_shape, field_height, field_width, padding=1, stride=1):
-  # First figure out what the size of the output should be
   N, C, H, W = x_shape
-  assert (H + 2 * padding - field_height) % stride == 0
-  assert (W + 2 * padding - field_height) % stride == 0
-  out_height = (H + 2 * padding - field_height) / stride + 1
-  out_width = (W + 2 * padding - field_width) / stride + 1
+  key = (C, H, W, field_height, field_width, padding, stride)
+  if key in _im2col_indices_cache:
+    return _im2col_indices_cache[key]
+
+  # First figure out what the size of the output should be; fields that
+  # would run past the padded border are dropped, as in the naive layers
+  out_height = (H + 2 * padding - field_height) // stride + 1
+  out_width = (W + 2 * padding - field_width) // stride + 1
 
   i0 = np.repeat(np.arange(field_height), field_width)
   i0 = np.tile(i0, C)
@@ -19,6 +25,10 @@ def get_im2col_indices(x_shape, field_height, field_width, padding=1, stride=1):
 
   k = np.repeat(np.arange(C), field_height * field_width).reshape(-1, 1)
 
+  # the cached arrays are shared between callers, so guard them from writes
+  for idx in (k, i, j):
+    idx.flags.writeable = False
+  _im2col_indices_cache[key] = (k, i, j)
   return (k, i, j)
 
 
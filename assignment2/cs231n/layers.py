@@ -1,4 +1,11 @@
 import numpy as np
+from scipy.linalg.blas import get_blas_funcs
+try:
+  from numba import njit, prange
+except ImportError:
+  njit = None
+
+from cs231n.im2col import get_im2col_indices, col2im_indices
 
 
 def affine_forward(x, w, b):
@@ -17,18 +24,25 @@ def affine_forward(x, w, b):
   
   Returns a tuple of:
   - out: output, of shape (N, M)
-  - cache: (x, w, b)
+  - cache: (x_shape, x_rows, w), where x_rows is x reshaped to (N, D)
   """
 
   #############################################################################
   # TODO: Implement the affine forward pass. Store the result in out. You     #
   # will need to reshape the input into rows.                                 #
   #############################################################################
-  out = np.dot(x.reshape(x.shape[0], -1), w) + b
+  x_rows = np.ascontiguousarray(x.reshape(x.shape[0], -1))
+
+  # out.T = w.T * x_rows.T is Fortran-ordered, so gemm accumulates straight
+  # into a C-ordered out that already holds the broadcast bias
+  gemm = get_blas_funcs('gemm', (x_rows, w))
+  out = np.empty((x.shape[0], w.shape[1]), dtype=gemm.dtype)
+  out[...] = b
+  out = gemm(1., w.T, x_rows.T, beta=1., c=out.T, overwrite_c=True).T
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
-  cache = (x, w, b)
+  cache = (x.shape, x_rows, w)
   return out, cache
 
 
@@ -39,7 +53,8 @@ def affine_backward(dout, cache):
   Inputs:
   - dout: Upstream derivative, of shape (N, M)
   - cache: Tuple of:
-    - x: Input data, of shape (N, d_1, ... d_k)
+    - x_shape: Shape of the input data, (N, d_1, ... d_k)
+    - x_rows: Input data reshaped to (N, D)
     - w: Weights, of shape (D, M)
 
   Returns a tuple of:
@@ -47,13 +62,13 @@ def affine_backward(dout, cache):
   - dw: Gradient with respect to w, of shape (D, M)
   - db: Gradient with respect to b, of shape (M,)
   """
-  x, w, b = cache
+  x_shape, x_rows, w = cache
   dx, dw, db = None, None, None
   #############################################################################
   # TODO: Implement the affine backward pass.                                 #
   #############################################################################
-  dx = np.dot(dout, w.T).reshape(x.shape)
-  dw = np.dot(x.reshape(x.shape[0], -1).T, dout)
+  dx = np.dot(dout, w.T).reshape(x_shape)
+  dw = np.dot(x_rows.T, dout)
   db = np.sum(dout, axis=0)
   #############################################################################
   #                             END OF YOUR CODE                              #
@@ -100,8 +115,7 @@ def relu_backward(dout, cache):
   # TODO: Implement the ReLU backward pass.                                   #
   #############################################################################
 
-  dx = (cache > 0)
-  dx = dx * dout
+  dx = np.where(cache > 0, dout, 0)
 
   #############################################################################
   #                             END OF YOUR CODE                              #
@@ -109,6 +123,56 @@ def relu_backward(dout, cache):
   return dx
 
 
+if njit is not None:
+  @njit(parallel=True, fastmath=True)
+  def _batchnorm_forward_kernel(x, gamma, beta, eps):
+    """
+    Fused training-time batchnorm forward pass. x is walked row by row into
+    D-sized accumulators, so every pass reads memory in order. Returns out
+    together with the per-feature mean, variance and inverse std.
+    """
+    N, D = x.shape
+    mean = np.zeros(D)
+    for n in range(N):
+      for d in range(D):
+        mean[d] += x[n, d]
+    mean /= N
+    var = np.zeros(D)
+    for n in range(N):
+      for d in range(D):
+        var[d] += (x[n, d] - mean[d]) * (x[n, d] - mean[d])
+    var /= N
+    inv_std = 1. / np.sqrt(var + eps)
+    scale = gamma * inv_std
+    shift = beta - scale * mean
+    out = np.empty_like(x)
+    for n in prange(N):
+      for d in range(D):
+        out[n, d] = scale[d] * x[n, d] + shift[d]
+    return out, mean.astype(x.dtype), var.astype(x.dtype), inv_std.astype(x.dtype)
+
+  @njit(parallel=True, fastmath=True)
+  def _batchnorm_backward_kernel(dout, x, mean, inv_std, gamma):
+    """
+    Fused closed-form batchnorm backward pass, walking dout and x row by row.
+    Returns dx, dgamma and dbeta.
+    """
+    N, D = dout.shape
+    dgamma = np.zeros(D)
+    dbeta = np.zeros(D)
+    for n in range(N):
+      for d in range(D):
+        dgamma[d] += dout[n, d] * (x[n, d] - mean[d]) * inv_std[d]
+        dbeta[d] += dout[n, d]
+    scale = gamma * inv_std / N
+    dx = np.empty_like(dout)
+    for n in prange(N):
+      for d in range(D):
+        x_hat = (x[n, d] - mean[d]) * inv_std[d]
+        dx[n, d] = scale[d] * (N * dout[n, d] - dbeta[d] - x_hat * dgamma[d])
+    return dx, dgamma.astype(dout.dtype), dbeta.astype(dout.dtype)
+
+
 def batchnorm_forward(x, gamma, beta, bn_param):
   """
   Forward pass for batch normalization.
@@ -180,33 +244,32 @@ def batchnorm_forward(x, gamma, beta, bn_param):
       cache = (x, N, sample_mean, sample_var, x_hat, gamma, beta, eps)
     '''
 
-    # 1. sample mean, shape=(D, )
-    sample_mean = np.sum(x, axis=0) / float(N)
-
-    # 2. (x - sample_mean), shape=(N, D)
-    x_mean = x - sample_mean
-
-    # 3. x_mean square, shape=(N, D)
-    x_mean_squ = x_mean ** 2
-
-    # 4. sample_var, shape=(D, )
-    sample_var = np.sum(x_mean_squ, axis=0) / float(N)
-
-    # 5. sqrt(sample_var + eps), shape=(D, )
-    sample_var_sqrt = (sample_var + eps) ** 0.5
-
-    # 6. x_hat, shape=(N, D)
-    x_hat = x_mean / sample_var_sqrt
-
-    # 7. out, shape=(N, D)
-    out = gamma * x_hat + beta
-
-    # Store the updated running means back into bn_param
-    bn_param['running_mean'] = momentum * running_mean + (1 - momentum) * sample_mean
-    bn_param['running_var'] = momentum * running_var + (1 - momentum) * sample_var
+    if njit is not None:
+      out, sample_mean, sample_var, inv_std = _batchnorm_forward_kernel(x, gamma, beta, eps)
+    else:
+      # sample mean and variance, shape=(D, )
+      sample_mean = x.mean(axis=0)
+      sample_var = x.var(axis=0)
+
+      # fold normalization into the affine transform: out = scale * x + shift
+      inv_std = 1. / np.sqrt(sample_var + eps)
+      scale = gamma * inv_std
+      shift = beta - scale * sample_mean
+
+      # out, shape=(N, D)
+      out = x * scale
+      out += shift
+
+    # Update the running means in place and store them back into bn_param
+    running_mean *= momentum
+    running_mean += (1 - momentum) * sample_mean
+    running_var *= momentum
+    running_var += (1 - momentum) * sample_var
+    bn_param['running_mean'] = running_mean
+    bn_param['running_var'] = running_var
 
     # cache for back prop
-    cache = (x, N, sample_mean, x_mean, x_mean_squ, sample_var, sample_var_sqrt, x_hat, gamma, beta, eps)
+    cache = (x, N, sample_mean, sample_var, inv_std, gamma, eps)
     #############################################################################
     #                             END OF YOUR CODE                              #
     #############################################################################
@@ -217,8 +280,9 @@ def batchnorm_forward(x, gamma, beta, bn_param):
     # and shift the normalized data using gamma and beta. Store the result in   #
     # the out variable.                                                         #
     #############################################################################
-    x_hat = (x - running_mean) / np.sqrt(running_var + eps)
-    out = gamma * x_hat + beta
+    scale = gamma / np.sqrt(running_var + eps)
+    out = x * scale
+    out += beta - scale * running_mean
     #############################################################################
     #                             END OF YOUR CODE                              #
     #############################################################################
@@ -271,7 +335,13 @@ def batchnorm_backward(dout, cache):
     dx = df * gamma * (g+eps)**(-0.5) * (N * dout - np.sum(dout, axis=0) - (x-f) / (g+eps) * np.sum(dout * (x-f), axis=0))
   '''
 
-  (x, N, sample_mean, x_mean, x_mean_squ, sample_var, sample_var_sqrt, x_hat, gamma, beta, eps) = cache
+  (x, N, sample_mean, sample_var, inv_std, gamma, eps) = cache
+
+  # forward intermediates are not cached; recompute the ones needed here
+  x_mean = x - sample_mean
+  x_mean_squ = x_mean ** 2
+  sample_var_sqrt = (sample_var + eps) ** 0.5
+  x_hat = x_mean * inv_std
 
   # 7. dgamma: shape=(D, ), dbeta: shape=(D, ), dx_hat: shape=(N, D)
   dgamma = np.sum(dout * x_hat, axis=0)
@@ -286,7 +356,7 @@ def batchnorm_backward(dout, cache):
   dsample_var = dsample_var_sqrt * 0.5 * (sample_var + eps)**(-0.5)
 
   # 4. dx_mean_squ: shape=(N, D)
-  dx_mean_squ = dsample_var * np.ones(x_mean_squ.shape) / float(N)
+  dx_mean_squ = dsample_var * np.ones_like(x_mean_squ) / float(N)
 
   # 3. dx_mean: shape=(N, D)
   dx_mean += dx_mean_squ * 2. * x_mean
@@ -296,7 +366,7 @@ def batchnorm_backward(dout, cache):
   dsample_mean = np.sum(dx_mean * -1., axis=0)
 
   # 1. dx, shape=(N, D)
-  dx += dsample_mean * np.ones(x.shape) / float(N)
+  dx += dsample_mean * np.ones_like(x) / float(N)
 
   #############################################################################
   #                             END OF YOUR CODE                              #
@@ -326,14 +396,16 @@ def batchnorm_backward_alt(dout, cache):
   # should be able to compute gradients with respect to the inputs in a       #
   # single statement; our implementation fits on a single 80-character line.  #
   #############################################################################
-  (x, N, sample_mean, x_mean, x_mean_squ, sample_var, sample_var_sqrt, x_hat, gamma, beta, eps) = cache
+  (x, N, sample_mean, sample_var, inv_std, gamma, eps) = cache
+  if njit is not None:
+    return _batchnorm_backward_kernel(dout, x, sample_mean, inv_std, gamma)
+
+  x_hat = (x - sample_mean) * inv_std
 
   dgamma = np.sum(dout * x_hat, axis=0)
   dbeta = np.sum(dout, axis=0)
-  f = sample_mean
-  g = sample_var
-  df = 1. / N
-  dx = df * gamma * (g+eps)**(-0.5) * (N * dout - np.sum(dout, axis=0) - (x-f) / (g+eps) * np.sum(dout * (x-f), axis=0))
+  # the reductions over dx_hat are gamma * dbeta and gamma * dgamma
+  dx = (gamma * inv_std / N) * (N * dout - dbeta - x_hat * dgamma)
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
@@ -358,7 +430,8 @@ def dropout_forward(x, dropout_param):
   Outputs:
   - out: Array of the same shape as x.
   - cache: A tuple (dropout_param, mask). In training mode, mask is the dropout
-    mask that was used to multiply the input; in test mode, mask is None.
+    mask that was used to multiply the input, flattened and packed with
+    np.packbits; in test mode, mask is None.
   """
   p, mode = dropout_param['p'], dropout_param['mode']
   if 'seed' in dropout_param:
@@ -373,7 +446,10 @@ def dropout_forward(x, dropout_param):
     # Store the dropout mask in the mask variable.                            #
     ###########################################################################
     mask = np.random.rand(*x.shape) >= p
-    out = x * mask / (1. - p)
+    out = x / (1. - p)
+    out *= mask
+    # only the backward pass needs the mask; keep it packed eight per byte
+    mask = np.packbits(mask)
     ###########################################################################
     #                            END OF YOUR CODE                             #
     ###########################################################################
@@ -409,7 +485,9 @@ def dropout_backward(dout, cache):
     ###########################################################################
     # TODO: Implement the training phase backward pass for inverted dropout.  #
     ###########################################################################
-    dx = dout * mask / (1. - p)
+    mask = np.unpackbits(mask)[:dout.size].reshape(dout.shape)
+    dx = dout / (1. - p)
+    dx *= mask
     ###########################################################################
     #                            END OF YOUR CODE                             #
     ###########################################################################
@@ -419,6 +497,30 @@ def dropout_backward(dout, cache):
   return dx
 
 
+# the most recently used zero-padded input buffer, keyed on (shape, pad, dtype);
+# only its interior is ever written, so the zero border survives reuse
+_pad_buffer = (None, None)
+
+
+def _pad_input(x, pad):
+  """
+  Zero-pad the spatial dimensions of x of shape (N, C, H, W) by pad pixels.
+  Consecutive calls with the same shape reuse one buffer, so the returned
+  array is overwritten by the next call and must not be kept around.
+  """
+  global _pad_buffer
+  if pad == 0:
+    return x
+  N, C, H, W = x.shape
+  key = (x.shape, pad, x.dtype)
+  if _pad_buffer[0] != key:
+    x_pad = np.zeros((N, C, H + 2 * pad, W + 2 * pad), dtype=x.dtype)
+    _pad_buffer = (key, x_pad)
+  x_pad = _pad_buffer[1]
+  x_pad[:, :, pad:pad + H, pad:pad + W] = x
+  return x_pad
+
+
 def conv_forward_naive(x, w, b, conv_param):
   """
   A naive implementation of the forward pass for a convolutional layer.
@@ -438,9 +540,9 @@ def conv_forward_naive(x, w, b, conv_param):
 
   Returns a tuple of:
   - out: Output data, of shape (N, F, H', W') where H' and W' are given by
-    H' = 1 + (H + 2 * pad - HH) / stride
-    W' = 1 + (W + 2 * pad - WW) / stride
-  - cache: (x, w, b, conv_param)
+    H' = 1 + (H + 2 * pad - HH) // stride
+    W' = 1 + (W + 2 * pad - WW) // stride
+  - cache: (x, w, b, conv_param, x_cols)
   """
   #############################################################################
   # TODO: Implement the convolutional forward pass.                           #
@@ -451,31 +553,23 @@ def conv_forward_naive(x, w, b, conv_param):
   (F, ) = b.shape
   stride = conv_param['stride']
   pad = conv_param['pad']
-  H_prime = 1 + (H + 2 * pad - HH) / stride
-  W_prime = 1 + (W + 2 * pad - WW) / stride
+  H_prime = 1 + (H + 2 * pad - HH) // stride
+  W_prime = 1 + (W + 2 * pad - WW) // stride
 
-  out = np.zeros((N, F, H_prime, W_prime))
+  x_pad = _pad_input(x, pad)
 
-  npad = ((0,), (0,), (pad,), (pad,))
-  x_pad = np.pad(x, pad_width=npad, mode='constant', constant_values=0)
+  # im2col: x_cols, shape=(C * HH * WW, H_prime * W_prime * N)
+  k, i, j = get_im2col_indices(x.shape, HH, WW, pad, stride)
+  x_cols = x_pad[:, k, i, j].transpose(1, 2, 0).reshape(C * HH * WW, -1)
 
-  for i in range(H_prime):
-    for j in range(W_prime):
-      hs, he = i*stride, i*stride+HH
-      ws, we = j*stride, j*stride+WW
-      tensor = x_pad[:, :, hs:he, ws:we].flatten()  # shape=(N * C * HH * WW)
-      for k in range(F):
-        shape = np.concatenate([[N],np.ones(len(w[k].shape))])  # shape=(N, 1, 1, 1)
-        f = np.tile(w[k], shape).flatten()    # shape=(N * C * HH * WW)
-        dot = tensor*f                        # shape=(N * C * HH * WW)
-        Nsplit = np.split(dot, N)             # shape=(N, C * HH * WW)
-        Nsum = np.sum(Nsplit, axis=1) + b[k]  # shape=(N, )
-        out[:, k, i, j] = Nsum                # assign sum to out
+  # all filters at all locations as a single matrix multiply
+  out = w.reshape(F, -1).dot(x_cols) + b.reshape(-1, 1)
+  out = out.reshape(F, H_prime, W_prime, N).transpose(3, 0, 1, 2)
 
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
-  cache = (x, w, b, conv_param)
+  cache = (x, w, b, conv_param, x_cols)
   return out, cache
 
 
@@ -485,7 +579,7 @@ def conv_backward_naive(dout, cache):
 
   Inputs:
   - dout: Upstream derivatives.
-  - cache: A tuple of (x, w, b, conv_param) as in conv_forward_naive
+  - cache: A tuple of (x, w, b, conv_param, x_cols) as in conv_forward_naive
 
   Returns a tuple of:
   - dx: Gradient with respect to x
@@ -497,47 +591,25 @@ def conv_backward_naive(dout, cache):
   # TODO: Implement the convolutional backward pass.                          #
   # borrow from https://github.com/cthorey/CS231/                             #
   #############################################################################
-  (x, weight, b, conv_param) = cache
+  (x, weight, b, conv_param, x_cols) = cache
   (N, C, H, W) = x.shape
   (F, C, HH, WW) = weight.shape
   (F, ) = b.shape
   stride = conv_param['stride']
   pad = conv_param['pad']
-  H_prime = 1 + (H + 2 * pad - HH) / stride
-  W_prime = 1 + (W + 2 * pad - WW) / stride
-
-  npad = ((0,), (0,), (pad,), (pad,))
-  x_pad = np.pad(x, pad_width=npad, mode='constant', constant_values=0)
 
   # db: shape=(F,)
-  db = np.zeros(b.shape)
-  for f in range(F):
-    db[f] = np.sum(dout[:, f, :, :])
+  db = np.sum(dout, axis=(0, 2, 3))
+
+  # dout_reshaped: shape=(F, H_prime * W_prime * N), same order as x_cols
+  dout_reshaped = dout.transpose(1, 2, 3, 0).reshape(F, -1)
 
   # dw: shape(F, C, HH, WW)
-  dw = np.zeros(weight.shape)
-  for f in range(F):
-    for c in range(C):
-      for h in range(HH):
-        for w in range(WW):
-          x_loc = x_pad[:, c, h:h + H_prime * stride:stride, w:w + W_prime * stride:stride]  # shape=(N, H_prime, W_prime)
-          dw[f, c, h, w] = np.sum(dout[:, f, :, :] * x_loc)
+  dw = dout_reshaped.dot(x_cols.T).reshape(weight.shape)
 
   # dx: shape=(N, C, H, W)
-  dx = np.zeros(x.shape)
-  for n in range(N):
-    for f in range(F):
-      for h in range(H):
-        for w in range(W):
-          for hp in range(H_prime):
-            for wp in range(W_prime):
-              mask1 = np.zeros_like(weight[f, :, :, :])  # shape=(C, HH, WW)
-              mask2 = np.zeros_like(weight[f, :, :, :])  # shape=(C, HH, WW)
-              if (h + pad - hp * stride) < HH and (h + pad - hp * stride) >= 0:
-                mask1[:, h + pad - hp * stride, :] = 1.
-              if (w + pad - wp * stride) < WW and (w + pad - wp * stride) >= 0:
-                mask2[:, :, w + pad - wp * stride] = 1.
-              dx[n, :, h, w] += dout[n, f, hp, wp] * np.sum(weight[f, :, :, :] * mask1 * mask2, axis=(1, 2))
+  dx_cols = weight.reshape(F, -1).T.dot(dout_reshaped)
+  dx = col2im_indices(dx_cols, x.shape, HH, WW, pad, stride)
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
@@ -557,7 +629,7 @@ def max_pool_forward_naive(x, pool_param):
 
   Returns a tuple of:
   - out: Output data
-  - cache: (x, pool_param)
+  - cache: (x, pool_param, max_idx, tiled)
   """
   #############################################################################
   # TODO: Implement the max pooling forward pass                              #
@@ -567,23 +639,30 @@ def max_pool_forward_naive(x, pool_param):
   pool_w = pool_param['pool_width']
   pool_s = pool_param['stride']
 
-  H_prime = 1 + (H - pool_h) / pool_s
-  W_prime = 1 + (W - pool_w) / pool_s
+  H_prime = 1 + (H - pool_h) // pool_s
+  W_prime = 1 + (W - pool_w) // pool_s
 
-  out = np.zeros((N, C, H_prime, W_prime))
-  for i in range(H_prime):
-    for j in range(W_prime):
-      hs, he = i*pool_s, i*pool_s+pool_h
-      ws, we = j*pool_s, j*pool_s+pool_w
-      for n in range(N):
-        for c in range(C):
-          loc_max = np.max(x[n, c, hs:he, ws:we])
-          out[n, c, i, j] = loc_max
+  # x_windows: shape=(N, C, H_prime, W_prime, pool_h * pool_w)
+  same_size = pool_h == pool_w == pool_s
+  tiled = same_size and H % pool_h == 0 and W % pool_w == 0
+  if tiled:
+    # the pooling regions tile x, so a reshape exposes every window at once
+    x_windows = x.reshape(N, C, H_prime, pool_h, W_prime, pool_w)
+    x_windows = x_windows.transpose(0, 1, 2, 4, 3, 5).reshape(N, C, H_prime, W_prime, -1)
+  else:
+    rows = pool_s * np.arange(H_prime)[:, None] + np.arange(pool_h)
+    cols = pool_s * np.arange(W_prime)[:, None] + np.arange(pool_w)
+    x_windows = x[:, :, rows[:, None, :, None], cols[None, :, None, :]]
+    x_windows = x_windows.reshape(N, C, H_prime, W_prime, -1)
+
+  # max_idx: flat index of the max inside each window, shape=(N, C, H_prime, W_prime)
+  max_idx = x_windows.argmax(axis=4)
+  out = x_windows.max(axis=4)
 
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
-  cache = (x, pool_param)
+  cache = (x, pool_param, max_idx, tiled)
   return out, cache
 
 
@@ -593,7 +672,7 @@ def max_pool_backward_naive(dout, cache):
 
   Inputs:
   - dout: Upstream derivatives
-  - cache: A tuple of (x, pool_param) as in the forward pass.
+  - cache: A tuple of (x, pool_param, max_idx, tiled) as in the forward pass.
 
   Returns:
   - dx: Gradient with respect to x
@@ -601,27 +680,32 @@ def max_pool_backward_naive(dout, cache):
   #############################################################################
   # TODO: Implement the max pooling backward pass                             #
   #############################################################################
-  (x, pool_param) = cache
+  (x, pool_param, max_idx, tiled) = cache
   (N, C, H, W) = x.shape
   pool_h = pool_param['pool_height']
   pool_w = pool_param['pool_width']
   pool_s = pool_param['stride']
 
-  H_prime = 1 + (H - pool_h) / pool_s
-  W_prime = 1 + (W - pool_w) / pool_s
-
-  dx = np.zeros(x.shape)
-  for n in range(N):
-    for c in range(C):
-      for i in range(H_prime):
-        for j in range(W_prime):
-          hs, he = i*pool_s, i*pool_s+pool_h
-          ws, we = j*pool_s, j*pool_s+pool_w
-          local = x[n, c, hs:he, ws:we]
-          max_idx = np.unravel_index(local.argmax(), local.shape)
-          x_mask = np.zeros_like(local)
-          x_mask[max_idx] += 1.
-          dx[n, c, hs:he, ws:we] += dout[n, c, i, j] * x_mask
+  H_prime = 1 + (H - pool_h) // pool_s
+  W_prime = 1 + (W - pool_w) // pool_s
+
+  if tiled:
+    # windows do not overlap: write dout into its window slot, then undo
+    # the reshape from the forward pass
+    dx_windows = np.zeros((N * C * H_prime * W_prime, pool_h * pool_w), dtype=x.dtype)
+    dx_windows[np.arange(dx_windows.shape[0]), max_idx.ravel()] = dout.ravel()
+    dx_windows = dx_windows.reshape(N, C, H_prime, W_prime, pool_h, pool_w)
+    dx = dx_windows.transpose(0, 1, 2, 4, 3, 5).reshape(x.shape)
+  else:
+    # position of every max in x, each of shape=(N, C, H_prime, W_prime)
+    n_idx = np.arange(N).reshape(-1, 1, 1, 1)
+    c_idx = np.arange(C).reshape(1, -1, 1, 1)
+    h_idx = pool_s * np.arange(H_prime).reshape(-1, 1) + max_idx // pool_w
+    w_idx = pool_s * np.arange(W_prime) + max_idx % pool_w
+
+    # overlapping windows may share a max, so accumulate rather than assign
+    dx = np.zeros_like(x)
+    np.add.at(dx, (n_idx, c_idx, h_idx, w_idx), dout)
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
@@ -659,7 +743,10 @@ def spatial_batchnorm_forward(x, gamma, beta, bn_param):
   # version of batch normalization defined above. Your implementation should  #
   # be very short; ours is less than five lines.                              #
   #############################################################################
-  pass
+  N, C, H, W = x.shape
+  x_flat = x.transpose(0, 2, 3, 1).reshape(-1, C)
+  out_flat, cache = batchnorm_forward(x_flat, gamma, beta, bn_param)
+  out = out_flat.reshape(N, H, W, C).transpose(0, 3, 1, 2)
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
@@ -689,7 +776,10 @@ def spatial_batchnorm_backward(dout, cache):
   # version of batch normalization defined above. Your implementation should  #
   # be very short; ours is less than five lines.                              #
   #############################################################################
-  pass
+  N, C, H, W = dout.shape
+  dout_flat = dout.transpose(0, 2, 3, 1).reshape(-1, C)
+  dx_flat, dgamma, dbeta = batchnorm_backward_alt(dout_flat, cache)
+  dx = dx_flat.reshape(N, H, W, C).transpose(0, 3, 1, 2)
   #############################################################################
   #                             END OF YOUR CODE                              #
   #############################################################################
@@ -712,15 +802,15 @@ def svm_loss(x, y, eps=1e-3):
   - dx: Gradient of the loss with respect to x
   """
   N = x.shape[0]
-  correct_class_scores = x[np.arange(N), y]
-  margins = np.maximum(0, x - correct_class_scores[:, np.newaxis] + 1.0)
+  inv_N = 1. / float(N + eps)
+  margins = x - x[np.arange(N), y][:, np.newaxis] + 1.0
+  np.maximum(margins, 0, out=margins)
   margins[np.arange(N), y] = 0
-  loss = np.sum(margins) / float(N + eps)
-  num_pos = np.sum(margins > 0, axis=1)
-  dx = np.zeros_like(x)
-  dx[margins > 0] = 1
-  dx[np.arange(N), y] -= num_pos
-  dx /= float(N + eps)
+  loss = np.sum(margins) * inv_N
+  dx = (margins > 0).astype(x.dtype)
+  # the correct class is masked out, so each row sum counts the positive margins
+  dx[np.arange(N), y] -= np.sum(dx, axis=1)
+  dx *= inv_N
   return loss, dx
 
 
@@ -738,12 +828,11 @@ def softmax_loss(x, y, eps=1e-8):
   - loss: Scalar giving the loss
   - dx: Gradient of the loss with respect to x
   """
-  probs = np.exp(x - np.max(x, axis=1, keepdims=True))
-  probs /= np.sum(probs, axis=1, keepdims=True)
-  probs += eps
   N = x.shape[0]
-  loss = -np.sum(np.log(probs[np.arange(N), y])) / float(N + eps)
-  dx = probs.copy()
+  log_probs = x - np.max(x, axis=1, keepdims=True)
+  log_probs -= np.log(np.sum(np.exp(log_probs), axis=1, keepdims=True))
+  loss = -np.sum(log_probs[np.arange(N), y]) / float(N + eps)
+  dx = np.exp(log_probs)
   dx[np.arange(N), y] -= 1
   dx /= float(N + eps)
   return loss, dx